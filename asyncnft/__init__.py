@@ -3,4 +3,9 @@
 from .__version__ import __version__
 
 from .ruleset import Ruleset
+from .check import Script
+from .check import ValidationError
+from .namespace import NamespaceRulesetManager
+from .sync import NftThread
+from .sync import SyncRuleset
 
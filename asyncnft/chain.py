@@ -1,30 +1,51 @@
 # Copyright: 2018, CCX Technologies
 
+import re
+import sys
 import asyncio
 
 from .rule import Rule
+from .rule import RuleStore
+from .rule import terminal_verdict
+from .counter import counter_match
+from .flowtable import Flowtable
 from .nft import wait_intialized
 
+rule_pattern = re.compile(r"^\s+(?P<statement>.+) # handle (?P<handle>\d+)$")
+echo_handle_pattern = re.compile(r"# handle (?P<handle>\d+)$", re.MULTILINE)
+
 
 class Chain:
 
     timeout = 10
 
-    def __init__(self, name, table):
+    def __init__(self, name, table, profiling=False):
         """Regular chains are containers for rules, a regular chain may be
-        used as jump target and is used for better rule organization."""
+        used as jump target and is used for better rule organization.
+
+        If profiling is True an anonymous counter is added to every rule
+        created through this chain, see profile and reorder_by_hits."""
 
         self.initialized = asyncio.Event()
 
         self.nft = table.nft
-        self.name = name
+        self.name = sys.intern(name)
         self.table = table.name
         self._table = table
+        self.profiling = profiling
+
+        self.rules = RuleStore()
+
+    def line(self, command, *args):
+        """The nft command line for command."""
+        return ' '.join((command, 'chain', self.table, self.name, *args))
 
     async def cmd(self, command, *args):
-        return await self.nft.cmd(
-                command, 'chain', self.table, self.name, *args
-        )
+        return await self.nft.cmd(self.line(command, *args))
+
+    def load_line(self):
+        """The nft command line load sends."""
+        return self.line('add')
 
     async def load(self, flush_existing=False):
         """Load the chain, must be called before calling any other methods.
@@ -35,7 +56,7 @@ class Chain:
         if self.initialized.is_set():
             raise RuntimeError("Already Initialized")
 
-        response = await self.cmd('add')
+        response = await self.nft.cmd(self.load_line())
         if flush_existing and not response:
             await self.cmd('flush')
 
@@ -45,10 +66,12 @@ class Chain:
     async def flush(self):
         """Flush all rules of the chain."""
         await self.cmd('flush')
+        self.rules.clear()
 
     async def delete(self):
         """Delete the chain, any subsequent calls to this chain will fail."""
         await self.cmd('flush')
+        self.rules.clear()
         await self._table.remove_rule_jumps(self)
         await self.cmd('delete')
 
@@ -75,6 +98,145 @@ class Chain:
         await rule.append(after)
         return rule
 
+    async def _listing(self):
+        listing = []
+        for line in (await self.list()).split('\n'):
+            match = rule_pattern.match(line)
+            if not match or match['statement'].startswith('chain '):
+                continue
+
+            packets = counter_match.search(match['statement'])
+            listing.append(
+                    (
+                            int(match['handle']),
+                            int(packets['packets']) if packets else None
+                    )
+            )
+
+        return listing
+
+    @wait_intialized
+    async def profile(self):
+        """Get the number of packets that have matched each rule with a
+        counter, as a dict of rule handle to packets, in chain order."""
+        return {
+                handle: packets
+                for handle, packets in await self._listing()
+                if packets is not None
+        }
+
+    @wait_intialized
+    async def reorder_by_hits(self):
+        """Move the most matched rules earlier in the chain.
+
+        Only consecutive rules created through this chain with an anonymous
+        counter and the same terminal verdict (see rule.terminal_verdict) are
+        reordered, since their order can't change what happens to a packet.
+        The reordered rules are re-added and the old ones deleted in one
+        transaction, so they get new handles and their counters restart.
+
+        Returns the expected average number of rules evaluated per matched
+        packet before and after."""
+
+        listing = await self._listing()
+
+        runs, run, verdict = [], [], None
+        for handle, packets in listing:
+            rule = self.rules.get(handle)
+            rule_verdict = None
+            if (rule is not None) and (packets is not None):
+                rule_verdict = terminal_verdict(rule.statement)
+
+            if (rule_verdict is None) or (rule_verdict != verdict):
+                if len(run) > 1:
+                    runs.append(run)
+                run = []
+
+            verdict = rule_verdict
+            if rule_verdict is not None:
+                run.append((rule, packets))
+
+        if len(run) > 1:
+            runs.append(run)
+
+        order = [handle for handle, _ in listing]
+        hits = {handle: packets or 0 for handle, packets in listing}
+        commands, moved = [], []
+
+        for run in runs:
+            ordered = sorted(run, key=lambda r: r[1], reverse=True)
+            if ordered == run:
+                continue
+
+            anchor = run[0][0].handle
+            start = order.index(anchor)
+            order[start:start + len(run)] = [r.handle for r, _ in ordered]
+
+            for rule, _ in ordered:
+                commands.append(
+                        f"insert rule {self.table} {self.name}"
+                        f" position {anchor} {rule.statement}"
+                )
+            for rule, _ in run:
+                commands.append(
+                        f"delete rule {self.table} {self.name}"
+                        f" handle {rule.handle}"
+                )
+
+            moved.append(([r for r, _ in run], [r for r, _ in ordered]))
+
+        total = sum(hits.values())
+
+        def evaluated(handles):
+            if not total:
+                return 0.0
+            return sum(
+                    i * hits[handle] for i, handle in enumerate(handles, 1)
+            ) / total
+
+        result = {
+                'before': evaluated([handle for handle, _ in listing]),
+                'after': evaluated(order),
+        }
+
+        if not commands:
+            return result
+
+        response = await self.nft.cmd('; '.join(commands))
+        handles = [int(h) for h in echo_handle_pattern.findall(response)]
+        if len(handles) != sum(len(rules) for rules, _ in moved):
+            raise RuntimeError(f"Unable to parse handles from {response}")
+
+        handles = iter(handles)
+        for rules, ordered in moved:
+            previous = rules[0]._prev
+            for rule in rules:
+                self.rules.remove(rule)
+
+            for rule in ordered:
+                rule.handle = next(handles)
+                if previous is None:
+                    self.rules.insert(rule)
+                else:
+                    self.rules.append(rule, previous)
+                previous = rule
+
+        return result
+
+    def rule_by_handle(self, handle):
+        """Get a rule added through this chain by its handle, returns None if
+        there is no such rule."""
+        return self.rules.get(handle)
+
+    def rule_at(self, position):
+        """Get a rule added through this chain by its position among those
+        rules (0 is the top), raises IndexError if there is no such rule."""
+        return self.rules.at(position)
+
+    def __iter__(self):
+        """Iterate over the rules added through this chain, in chain order."""
+        return iter(self.rules)
+
     def __str__(self):
         return self.name
 
@@ -88,7 +250,8 @@ class BaseChain(Chain):
             hook,
             device=None,
             priority=0,
-            policy='accept'
+            policy='accept',
+            profiling=False
     ):
         """A base chain is an entry point for packets from the Linux
         networking stack.
@@ -102,7 +265,7 @@ class BaseChain(Chain):
         packets not explicitly accepted or refused in contained rules.
         Supported policy values are accept (which is the default) or drop."""
 
-        super().__init__(name, table)
+        super().__init__(name, table, profiling)
 
         self.type = f"type {type_}"
         self.hook = f"hook {hook}"
@@ -110,21 +273,33 @@ class BaseChain(Chain):
         self.priority = f"priority {priority}"
         self.policy = f" policy {policy}"
 
-    async def load(self, flush_existing=False):
-        """Load the chain, must be called before calling any other methods.
-
-        If clear_existing is True and the table already exists it will be
-        flushed."""
-
-        if self.initialized.is_set():
-            raise RuntimeError("Already Initialized")
-
-        response = await self.cmd(
+    def load_line(self):
+        """The nft command line load sends."""
+        return self.line(
                 'add',
                 f"{{ {self.type} {self.hook} {self.device} {self.priority};"
                 f" {self.policy}; }}"
         )
-        if flush_existing and not response:
-            await self.cmd('flush')
 
-        self.initialized.set()
+    @wait_intialized
+    async def offload_established(
+            self, flowtable, protocols=('tcp', 'udp'), before=None
+    ):
+        """Add a rule that adds established connections of the listed
+        protocols to the flowtable, so the rest of their packets bypass
+        the forwarding path.
+
+        flowtable is a Flowtable or the name of one. The rule is added at the
+        top of the chain if before is None, otherwise before the rule passed
+        in the before argument."""
+
+        if isinstance(flowtable, Flowtable):
+            flowtable = flowtable.name
+        elif not isinstance(flowtable, str):
+            raise TypeError(f"Invalid flowtable {flowtable!r}")
+
+        return await self.insert_rule(
+                f"meta l4proto {{ {', '.join(protocols)} }}"
+                f" ct state established flow add @{flowtable.lstrip('@')}",
+                before
+        )
@@ -0,0 +1,142 @@
+# Copyright: 2018-2020, CCX Technologies
+
+import re
+import os
+import asyncio
+import hashlib
+import collections
+import async_timeout
+
+error_pattern = re.compile(
+        r"^[^\n]*?:(?P<line>\d+):[\d-]+: Error: (?P<message>.*)$", re.MULTILINE
+)
+
+
+class ValidationError(RuntimeError):
+    def __init__(self, errors):
+        """Raised when nft rejects a script, errors is a list of
+        (origin, line number, command line, message) tuples, origin is the
+        object the command was added for."""
+
+        self.errors = errors
+
+        super().__init__(
+                '\n'.join(
+                        f"{line}: {command} => {message}"
+                        for _, line, command, message in errors
+                )
+        )
+
+
+class Script:
+    def __init__(self):
+        """A list of nft commands, each remembering the Table, Chain, Rule,
+        Set, etc. it was generated for."""
+
+        self.lines = []
+        self.origins = []
+
+    def _append(self, origin, line):
+        self.lines.append(line)
+        self.origins.append(origin)
+
+    def add(self, origin, command, *args):
+        """Add a command for origin, built the same way origin.cmd would
+        send it to nft."""
+        self._append(origin, origin.line(command, *args))
+
+    def load(self, origin):
+        """Add the command origin.load sends, origin is a Table, Chain, Set,
+        Counter or Flowtable."""
+        self._append(origin, origin.load_line())
+
+    def insert_rule(self, rule, before=None):
+        """Add the command rule.insert(before) sends."""
+        self._append(rule, rule.insert_line(before))
+
+    def append_rule(self, rule, after=None):
+        """Add the command rule.append(after) sends."""
+        self._append(rule, rule.append_line(after))
+
+    def __len__(self):
+        return len(self.lines)
+
+    def __str__(self):
+        return ''.join(f"{line}\n" for line in self.lines)
+
+
+class Validator:
+
+    timeout = 30
+    cache_size = 1024
+
+    def __init__(self, nft, concurrency=4):
+        """Checks scripts with nft --check in separate short-lived nft
+        processes, so the interactive session isn't touched.
+
+        The nft executable and network namespace are taken from nft,
+        at most concurrency checks are run at the same time, each is killed
+        if it takes longer than timeout, and the hashes of the last
+        cache_size scripts that passed are kept so identical scripts aren't
+        checked again."""
+
+        self.nft = nft
+
+        self._passed = collections.OrderedDict()
+        self._semaphore = asyncio.Semaphore(concurrency)
+
+    async def _run(self, text):
+        async with self._semaphore:
+            process = await asyncio.create_subprocess_exec(
+                    *self.nft.argv('--check', '--file', '-'),
+                    stdin=asyncio.subprocess.PIPE,
+                    stdout=asyncio.subprocess.PIPE,
+                    stderr=asyncio.subprocess.STDOUT,
+                    preexec_fn=os.setpgrp
+            )
+            try:
+                async with async_timeout.timeout(self.timeout):
+                    output, _ = await process.communicate(text)
+
+            except BaseException:
+                if process.returncode is None:
+                    process.kill()
+                    await process.wait()
+                raise
+
+        return process.returncode, output.decode()
+
+    async def check(self, script):
+        """Check the script, raises ValidationError if nft rejects it."""
+
+        text = str(script).encode()
+        digest = hashlib.sha256(text).digest()
+
+        if digest in self._passed:
+            self._passed.move_to_end(digest)
+            return
+
+        returncode, output = await self._run(text)
+
+        errors = []
+        for match in error_pattern.finditer(output):
+            index = int(match['line']) - 1
+            if 0 <= index < len(script):
+                errors.append(
+                        (
+                                script.origins[index], index + 1,
+                                script.lines[index], match['message']
+                        )
+                )
+            else:
+                errors.append((None, index + 1, None, match['message']))
+
+        if returncode and not errors:
+            errors.append((None, None, None, output.strip()))
+
+        if errors:
+            raise ValidationError(errors)
+
+        self._passed[digest] = None
+        while len(self._passed) > self.cache_size:
+            self._passed.popitem(last=False)
@@ -28,10 +28,16 @@ class Counter:
         self.name = name
         self.table = table.name
 
+    def line(self, command, *args):
+        """The nft command line for command."""
+        return ' '.join((command, 'counter', self.table, self.name, *args))
+
     async def cmd(self, command, *args):
-        return await self.nft.cmd(
-                command, 'counter', self.table, self.name, *args
-        )
+        return await self.nft.cmd(self.line(command, *args))
+
+    def load_line(self):
+        """The nft command line load sends."""
+        return self.line('add')
 
     async def load(self, flush_existing=False):
         """Load the set, must be called before calling any other methods."""
@@ -39,7 +45,7 @@ class Counter:
         if self.initialized.is_set():
             raise RuntimeError("Already Initialized")
 
-        await self.cmd('add')
+        await self.nft.cmd(self.load_line())
 
         self.initialized.set()
 
@@ -0,0 +1,122 @@
+# Copyright: 2018-2020, CCX Technologies
+
+import re
+import asyncio
+
+from .nft import wait_intialized
+
+hook_match = re.compile(r"^\s+hook (?P<hook>\w+) priority (?P<priority>.+)$")
+devices_match = re.compile(r"^\s+devices = { (?P<devices>[^}]*) }$")
+handle_match = re.compile(r"^\s+flowtable \S+ { # handle (?P<handle>\d+)$")
+
+
+class Flowtable:
+
+    timeout = 10
+
+    def __init__(
+            self,
+            name,
+            table,
+            hook='ingress',
+            priority=0,
+            devices=None,
+            counter=False,
+    ):
+        """Flowtables allow established connections to bypass the classic
+        forwarding path, packets of flows added to the flowtable (with a
+        flow add rule) are forwarded directly from the ingress hook of
+        the listed devices.
+
+        If counter is True the flowtable keeps packet and byte counters for
+        offloaded flows, these are reported in the conntrack entries."""
+
+        self.initialized = asyncio.Event()
+
+        self.nft = table.nft
+        self.name = name
+        self.table = table.name
+
+        self.config = []
+        self.config.append(f"hook {hook} priority {priority};")
+
+        if devices:
+            self.config.append(f"devices = {{ {', '.join(devices)} }};")
+
+        if counter:
+            self.config.append("counter;")
+
+    def line(self, command, *args):
+        """The nft command line for command."""
+        return ' '.join((command, 'flowtable', self.table, self.name, *args))
+
+    async def cmd(self, command, *args):
+        return await self.nft.cmd(self.line(command, *args))
+
+    def load_line(self):
+        """The nft command line load sends."""
+        return self.line('add', f"{{ {' '.join(self.config)} }}")
+
+    async def load(self):
+        """Load the flowtable, must be called before calling any other
+        methods."""
+
+        if self.initialized.is_set():
+            raise RuntimeError("Already Initialized")
+
+        await self.nft.cmd(self.load_line())
+
+        self.initialized.set()
+
+    @wait_intialized
+    async def delete(self):
+        """Delete the flowtable, any rules that add flows to it must be
+        deleted first."""
+        await self.cmd('delete')
+
+        self.initialized.clear()
+
+    @wait_intialized
+    async def list(self):
+        """List the flowtable."""
+        return await self.cmd('list')
+
+    @wait_intialized
+    async def get(self):
+        """Get the flowtable's handle, hook, priority, devices and if it has
+        counters enabled."""
+
+        value = {
+                'handle': None,
+                'hook': None,
+                'priority': None,
+                'devices': [],
+                'counter': False,
+        }
+
+        for line in (await self.list()).split('\n'):
+            match = handle_match.match(line)
+            if match:
+                value['handle'] = int(match['handle'])
+                continue
+
+            match = hook_match.match(line)
+            if match:
+                value['hook'] = match['hook']
+                value['priority'] = match['priority']
+                continue
+
+            match = devices_match.match(line)
+            if match:
+                value['devices'] = [
+                        d.strip() for d in match['devices'].split(',')
+                ]
+                continue
+
+            if line.strip() == 'counter':
+                value['counter'] = True
+
+        return value
+
+    def __str__(self):
+        return f"@{self.name}"
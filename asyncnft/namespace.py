@@ -0,0 +1,144 @@
+# Copyright: 2018-2020, CCX Technologies
+
+import asyncio
+import collections
+
+from .ruleset import Ruleset
+
+
+class NamespaceRulesetManager:
+    def __init__(self, max_idle=32, concurrency=16, loop=None):
+        """Manages one Ruleset per network namespace, identified by the path
+        to the namespace (for example /var/run/netns/name).
+
+        An nft process is only started the first time a namespace is used,
+        at most max_idle unused nft processes are kept running (the least
+        recently used are stopped first) and at most concurrency namespaces
+        are operated on at the same time."""
+
+        self.loop = asyncio.get_event_loop() if loop is None else loop
+        self.max_idle = max_idle
+
+        self._known = collections.OrderedDict()
+        self._rulesets = collections.OrderedDict()
+        self._active = collections.Counter()
+        self._semaphore = asyncio.Semaphore(concurrency)
+
+    @property
+    def namespaces(self):
+        """Paths of all the namespaces added to the manager, whether or not
+        they have a running nft session."""
+        return list(self._known)
+
+    @property
+    def running(self):
+        """Paths of the namespaces with a running nft session."""
+        return list(self._rulesets)
+
+    def add(self, namespaces):
+        """Add a list of namespaces to the manager, nft isn't started in them
+        until they are used."""
+        for netns in namespaces:
+            self._known[netns] = None
+
+    async def remove(self, netns):
+        """Remove a namespace from the manager, stopping its nft session."""
+
+        self._known.pop(netns, None)
+
+        if not self._active[netns]:
+            ruleset = self._rulesets.pop(netns, None)
+            if ruleset is not None:
+                await ruleset.nft.close()
+
+    def _ruleset(self, netns):
+        self._known[netns] = None
+
+        ruleset = self._rulesets.pop(netns, None)
+        if (ruleset is None) or ruleset.nft.stopped:
+            ruleset = Ruleset(self.loop, netns)
+
+        self._rulesets[netns] = ruleset
+        return ruleset
+
+    async def _evict(self):
+        idle = [netns for netns in self._rulesets if not self._active[netns]]
+
+        for netns in idle[:max(len(idle) - self.max_idle, 0)]:
+            ruleset = self._rulesets.pop(netns)
+            await ruleset.nft.close()
+
+        for netns in [n for n in self._rulesets if n not in self._known]:
+            if not self._active[netns]:
+                await self._rulesets.pop(netns).nft.close()
+
+    async def run(self, netns, func, *args):
+        """Call the coroutine function func with the namespace's Ruleset and
+        args, returns its result.
+
+        The Ruleset must only be used until func returns, after that its nft
+        session may be stopped at any time."""
+
+        async with self._semaphore:
+            self._active[netns] += 1
+            try:
+                return await func(self._ruleset(netns), *args)
+
+            finally:
+                self._active[netns] -= 1
+                if not self._active[netns]:
+                    del self._active[netns]
+                await self._evict()
+
+    async def fan_out(self, func, *args, namespaces=None):
+        """Call the coroutine function func with the Ruleset of every
+        namespace (or only those in namespaces if it isn't None).
+
+        Returns a dict of namespace to result, or to the exception raised for
+        that namespace."""
+
+        namespaces = self.namespaces if namespaces is None else namespaces
+
+        results = await asyncio.gather(
+                *(self.run(netns, func, *args) for netns in namespaces),
+                return_exceptions=True
+        )
+
+        return dict(zip(namespaces, results))
+
+    @staticmethod
+    async def _element_cmd(ruleset, command, table, set_, elements):
+        return await ruleset.nft.cmd(
+                command, 'element', table, set_, f"{{ {','.join(elements)} }}"
+        )
+
+    async def add_elements(self, table, set_, elements, namespaces=None):
+        """Add a list of elements to the set named set_ in table in every
+        namespace."""
+        return await self.fan_out(
+                self._element_cmd,
+                'add',
+                table,
+                set_,
+                elements,
+                namespaces=namespaces
+        )
+
+    async def remove_elements(self, table, set_, elements, namespaces=None):
+        """Remove a list of elements from the set named set_ in table in every
+        namespace."""
+        return await self.fan_out(
+                self._element_cmd,
+                'delete',
+                table,
+                set_,
+                elements,
+                namespaces=namespaces
+        )
+
+    async def close(self):
+        """Stop all the nft processes and remove all the namespaces."""
+        self._known.clear()
+        while self._rulesets:
+            _, ruleset = self._rulesets.popitem()
+            await ruleset.nft.close()
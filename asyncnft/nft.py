@@ -20,12 +20,18 @@ class Nft:
 
     timeout = 30
     PROMPT = b'nft> \n'
+    NFT = '/sbin/nft'
+    NSENTER = '/usr/bin/nsenter'
 
-    def __init__(self, loop=None):
+    def __init__(self, loop=None, netns=None):
+        """If netns is set nft is started inside the network namespace at that
+        path (for example /var/run/netns/name or /proc/<pid>/ns/net)."""
 
+        self.netns = netns
         self.initialized = asyncio.Event()
         self.lock = asyncio.Lock()
         self.nft = None
+        self.error = None
         self.loop = asyncio.get_event_loop() if loop is None else loop
 
         asyncio.ensure_future(self._initialize(), loop=self.loop)
@@ -38,27 +44,55 @@ class Nft:
         if self.initialized.is_set() or (self.nft is not None):
             raise RuntimeError("Already Initialized")
 
-        await self._start_nft()
+        try:
+            await self._start_nft()
+        except Exception as exc:
+            self.error = exc
 
         self.initialized.set()
 
+    @property
+    def stopped(self):
+        """True if nft failed to start or has exited."""
+        return (self.error is not None) or (
+                (self.nft is not None) and (self.nft.returncode is not None)
+        )
+
+    def argv(self, *options):
+        """The command line used to run nft with options.
+
+        Every nft process is started with the command line from here, so
+        overriding it can run a stand-in for nft, which gets the namespace
+        from self.netns."""
+        if self.netns is None:
+            return [self.NFT, *options]
+        return [self.NSENTER, f"--net={self.netns}", self.NFT, *options]
+
     async def _start_nft(self):
+        if (self.netns is not None) and not os.path.exists(self.netns):
+            raise FileNotFoundError(f"No network namespace {self.netns}")
+
         self.nft = await asyncio.create_subprocess_exec(
-                '/sbin/nft',
-                '--echo',
-                '--handle',
-                '--interactive',
+                *self.argv('--echo', '--handle', '--interactive'),
                 stdin=asyncio.subprocess.PIPE,
                 stdout=asyncio.subprocess.PIPE,
                 stderr=asyncio.subprocess.STDOUT,
-                loop=self.loop,
                 preexec_fn=os.setpgrp
         )
 
+    async def close(self):
+        """Stop the nft process, any subsequent commands will fail."""
+        if (self.nft is not None) and (self.nft.returncode is None):
+            self.nft.terminate()
+            await self.nft.wait()
+
     @wait_intialized
     async def cmd(self, *command, _recurse=0):
         """Send an nft command."""
 
+        if self.error is not None:
+            raise self.error
+
         if self.nft is None:
             raise RuntimeError("Nft isn't initialized.")
 
@@ -92,7 +126,10 @@ class Nft:
                     )
 
                 if not status:
-                    break
+                    raise RuntimeError(
+                            f"Nft has stopped: {' '.join(command)}"
+                            f" => {response.decode()}"
+                    )
 
                 if status == self.PROMPT:
                     prompt = status
@@ -1,30 +1,99 @@
 # Copyright: 2018, CCX Technologies
 
+verdicts = (
+        'accept', 'drop', 'reject', 'queue', 'continue', 'return', 'jump',
+        'goto'
+)
+
+# statements that change state, or keep state per rule, so the rule's
+# position in the chain matters even if its verdict doesn't
+stateful = {
+        'log', 'limit', 'quota', 'count', 'last', 'numgen', 'set', 'add',
+        'update', 'delete', 'name', 'meter', 'notrack', 'dup', 'fwd', 'snat',
+        'dnat', 'masquerade', 'redirect', 'tproxy', 'synproxy', 'flow',
+        'vmap', 'queue', 'continue', 'return', 'jump', 'goto'
+}
+
+
+def counted(statement):
+    """Add an anonymous counter to the statement, before its verdict so it
+    only counts packets that matched the rule."""
+
+    tokens = statement.split()
+    if ('counter' in tokens) or ('vmap' in tokens):
+        return statement
+
+    depth = 0
+    for i, token in enumerate(tokens):
+        depth += token.count('{') - token.count('}')
+        if (depth == 0) and (token in verdicts):
+            return ' '.join(tokens[:i] + ['counter'] + tokens[i:])
+
+    return f"{statement} counter"
+
+
+def terminal_verdict(statement):
+    """The verdict of a statement that only matches and then accepts, drops
+    or rejects, or None for any other statement.
+
+    Reordering rules with the same terminal verdict can't change what
+    happens to a packet, only which rule's counter counts it."""
+
+    tokens = statement.split()
+    if not tokens or stateful.intersection(tokens):
+        return None
+
+    if tokens[-1] in ('accept', 'drop'):
+        return tokens[-1]
+
+    if 'reject' in tokens:
+        return ' '.join(tokens[tokens.index('reject'):])
+
+    return None
+
 
 class Rule:
 
-    handle = 0
+    __slots__ = ('_chain', 'statement', 'handle', '_prev', '_next')
 
     def __init__(self, statement, chain):
         """Rules are added to chain in a table. Rules are constructed from two
         kinds of components according to a set of grammatical rules:
         expressions and statements.
 
-        Refer to the netfilter man page for more info in expressions."""
+        Refer to the netfilter man page for more info in expressions.
 
-        self.nft = chain.nft
-        self.table = chain.table
-        self.chain = chain.name
-        self.statement = statement
+        If the chain is profiling an anonymous counter is added to the
+        statement."""
+
+        self._chain = chain
+        self.statement = counted(statement) if chain.profiling else statement
+        self.handle = 0
+
+        self._prev = None
+        self._next = None
+
+    @property
+    def nft(self):
+        return self._chain.nft
+
+    @property
+    def table(self):
+        return self._chain.table
+
+    @property
+    def chain(self):
+        return self._chain.name
+
+    def line(self, command, *args):
+        """The nft command line for command."""
+        return ' '.join((command, 'rule', self.table, self.chain, *args))
 
     async def cmd(self, command, *args):
-        return await self.nft.cmd(
-                command, 'rule', self.table, self.chain, *args
-        )
+        return await self.nft.cmd(self.line(command, *args))
 
-    async def insert(self, before=None):
-        """Add the rule at the top of the chain if before is None,
-            otherwise append before the rule passed in the before argument."""
+    def insert_line(self, before=None):
+        """The nft command line insert sends."""
 
         if self.handle:
             raise RuntimeError("Rule already has a handle.")
@@ -36,16 +105,23 @@ class Rule:
         else:
             statement = self.statement
 
-        response = await self.cmd('insert', statement)
+        return self.line('insert', statement)
+
+    async def insert(self, before=None):
+        """Add the rule at the top of the chain if before is None,
+            otherwise append before the rule passed in the before argument."""
+
+        response = await self.nft.cmd(self.insert_line(before))
 
         try:
             self.handle = int(response.split('\n')[0].split('# handle ')[-1])
         except ValueError:
             raise RuntimeError(f"Unable to parse handle from {response}")
 
-    async def append(self, after=None):
-        """Add the rule at the bottom of the chain if after is None,
-            otherwise append after the rule passed in the after argument."""
+        self._chain.rules.insert(self, before)
+
+    def append_line(self, after=None):
+        """The nft command line append sends."""
 
         if self.handle:
             raise RuntimeError("Rule already has a handle.")
@@ -57,13 +133,21 @@ class Rule:
         else:
             statement = self.statement
 
-        response = await self.cmd('add', statement)
+        return self.line('add', statement)
+
+    async def append(self, after=None):
+        """Add the rule at the bottom of the chain if after is None,
+            otherwise append after the rule passed in the after argument."""
+
+        response = await self.nft.cmd(self.append_line(after))
 
         try:
             self.handle = int(response.split('# handle ')[-1])
         except ValueError:
             raise RuntimeError(f"Unable to parse handle from {response}")
 
+        self._chain.rules.append(self, after)
+
     async def delete(self):
         """Delete the specified rule."""
 
@@ -72,12 +156,144 @@ class Rule:
 
         await self.cmd('delete', 'handle', str(self.handle))
 
+        self._chain.rules.remove(self)
         self.handle = 0
 
     async def replace(self, statement):
         """Replace the rules statement."""
 
+        if self._chain.profiling:
+            statement = counted(statement)
+
         self.statement = statement
 
         if self.handle:
             await self.cmd('replace', 'handle', str(self.handle), statement)
+
+
+class RuleStore:
+    def __init__(self):
+        """The rules of a chain, indexed by handle and kept in the same order
+        as they are in the chain.
+
+        The order is kept as a linked list through the rules themselves so
+        inserting before or after another rule doesn't need a scan. Rules
+        positioned relative to a rule that isn't in the store (for example
+        one added through another Chain object for the same chain) are
+        added at the bottom."""
+
+        self._handles = {}
+        self._first = None
+        self._last = None
+        self._order = None
+
+    def __len__(self):
+        return len(self._handles)
+
+    def __contains__(self, rule):
+        return self._handles.get(rule.handle) is rule
+
+    def __iter__(self):
+        rule = self._first
+        while rule is not None:
+            yield rule
+            rule = rule._next
+
+    def get(self, handle):
+        """Get the rule with handle, or None if it isn't in the chain."""
+        return self._handles.get(handle)
+
+    def at(self, position):
+        """Get the rule at position (0 is the top of the chain).
+
+        The positions are rebuilt on the first lookup after a change, so
+        lookups between changes don't need a scan."""
+
+        if self._order is None:
+            self._order = list(self)
+        return self._order[position]
+
+    def insert(self, rule, before=None):
+        """Add the rule at the top if before is None, otherwise before the
+        rule passed in the before argument."""
+
+        if (before is not None) and (before not in self):
+            self.append(rule)
+            return
+
+        if before is None:
+            before = self._first
+
+        rule._prev = None if before is None else before._prev
+        rule._next = before
+
+        self._link(rule)
+
+    def append(self, rule, after=None):
+        """Add the rule at the bottom if after is None, otherwise after the
+        rule passed in the after argument."""
+
+        if (after is None) or (after not in self):
+            after = self._last
+
+        rule._prev = after
+        rule._next = None if after is None else after._next
+
+        self._link(rule)
+
+    def _link(self, rule):
+        if rule._prev is None:
+            self._first = rule
+        else:
+            rule._prev._next = rule
+
+        if rule._next is None:
+            self._last = rule
+        else:
+            rule._next._prev = rule
+
+        self._handles[rule.handle] = rule
+        self._order = None
+
+    def remove(self, rule):
+        """Remove the rule."""
+
+        if rule not in self:
+            return
+
+        del self._handles[rule.handle]
+        self._order = None
+
+        if rule._prev is None:
+            self._first = rule._next
+        else:
+            rule._prev._next = rule._next
+
+        if rule._next is None:
+            self._last = rule._prev
+        else:
+            rule._next._prev = rule._prev
+
+        rule._prev = None
+        rule._next = None
+
+    def discard(self, handle):
+        """Remove the rule with handle if it's in the chain."""
+
+        rule = self._handles.get(handle)
+        if rule is not None:
+            self.remove(rule)
+            rule.handle = 0
+
+    def clear(self):
+        """Remove all the rules."""
+
+        for rule in list(self):
+            rule._prev = None
+            rule._next = None
+            rule.handle = 0
+
+        self._handles.clear()
+        self._first = None
+        self._last = None
+        self._order = None
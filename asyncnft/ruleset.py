@@ -2,17 +2,26 @@
 
 from .nft import Nft
 from .table import Table
+from .check import Validator
 
 
 class Ruleset:
-    def __init__(self, loop=None):
+    def __init__(self, loop=None, netns=None):
         """The ruleset keyword is used to identify the whole set of tables,
-        chains, etc. currently in place in kernel."""
+        chains, etc. currently in place in kernel.
 
-        self.nft = Nft(loop)
+        If netns is set the ruleset is the one in the network namespace at
+        that path."""
+
+        self.nft = Nft(loop, netns)
+        self.validator = Validator(self.nft)
+
+    def line(self, command, *args):
+        """The nft command line for command."""
+        return ' '.join((command, 'ruleset', *args))
 
     async def cmd(self, command, *args):
-        return await self.nft.cmd(command, 'ruleset', *args)
+        return await self.nft.cmd(self.line(command, *args))
 
     async def flush(self):
         """Clear the entire ruleset. This will remove all tables and whatever
@@ -30,6 +39,12 @@ class Ruleset:
 
         return await self.cmd('list')
 
+    async def check(self, script):
+        """Check a Script with nft --check in a separate nft process, raises
+        ValidationError with the objects and lines nft rejected."""
+
+        await self.validator.check(script)
+
     async def table(self, name, flush_existing=False):
         """Create a new (or load an existing) Table.
 
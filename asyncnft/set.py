@@ -71,8 +71,16 @@ class Set:
         if auto_merge:
             self.config.append(f"auto-merge;")
 
+    def line(self, command, *args):
+        """The nft command line for command."""
+        return ' '.join((command, 'set', self.table, self.name, *args))
+
     async def cmd(self, command, *args):
-        return await self.nft.cmd(command, 'set', self.table, self.name, *args)
+        return await self.nft.cmd(self.line(command, *args))
+
+    def load_line(self):
+        """The nft command line load sends."""
+        return self.line('add', f"{{ {' '.join(self.config)} }}")
 
     async def load(self, flush_existing=False):
         """Load the set, must be called before calling any other methods."""
@@ -80,7 +88,7 @@ class Set:
         if self.initialized.is_set():
             raise RuntimeError("Already Initialized")
 
-        await self.cmd('add', f"{{ {' '.join(self.config)} }}")
+        await self.nft.cmd(self.load_line())
 
         if flush_existing:
             await self.cmd('flush')
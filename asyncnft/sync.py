@@ -0,0 +1,378 @@
+# Copyright: 2018-2020, CCX Technologies
+
+import asyncio
+import threading
+import concurrent.futures
+
+from .ruleset import Ruleset
+
+try:
+    all_tasks = asyncio.all_tasks
+except AttributeError:
+    all_tasks = asyncio.Task.all_tasks
+
+
+class NftThread:
+
+    timeout = 60
+
+    def __init__(self):
+        """Runs an asyncio event loop in a dedicated background thread so
+        that synchronous code, from any number of threads, can share a single
+        nft session.
+
+        Commands from all threads are sent over the one nft process, one at
+        a time, in the order they are received."""
+
+        self.loop = asyncio.new_event_loop()
+        self._started = threading.Event()
+
+        self._thread = threading.Thread(
+                target=self._run, name='asyncnft', daemon=True
+        )
+        self._thread.start()
+        self._started.wait()
+
+    def _run(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.call_soon(self._started.set)
+        self.loop.run_forever()
+
+        try:
+            tasks = all_tasks(self.loop)
+            for task in tasks:
+                task.cancel()
+            self.loop.run_until_complete(
+                    asyncio.gather(*tasks, return_exceptions=True)
+            )
+            self.loop.run_until_complete(self.loop.shutdown_asyncgens())
+
+        finally:
+            self.loop.close()
+
+    def submit(self, func, *args, **kwargs):
+        """Run the coroutine function func on the loop thread, returns a
+        concurrent.futures.Future."""
+
+        if not self._thread.is_alive():
+            raise RuntimeError("Nft thread has stopped.")
+
+        return asyncio.run_coroutine_threadsafe(
+                func(*args, **kwargs), self.loop
+        )
+
+    def call(self, func, *args, **kwargs):
+        """Run the coroutine function func on the loop thread and block until
+        it completes, if it takes longer than timeout it is cancelled."""
+
+        if threading.current_thread() is self._thread:
+            raise RuntimeError("Blocking call from the nft loop thread.")
+
+        future = self.submit(func, *args, **kwargs)
+        try:
+            return future.result(self.timeout)
+
+        except concurrent.futures.TimeoutError:
+            future.cancel()
+            raise
+
+    def close(self):
+        """Stop the event loop, cancel anything still running on it and wait
+        for the thread to exit."""
+
+        if threading.current_thread() is self._thread:
+            raise RuntimeError("Blocking call from the nft loop thread.")
+
+        if self._thread.is_alive():
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            self._thread.join()
+
+
+class _SyncWrapper:
+    def __init__(self, wrapped, thread):
+        self._wrapped = wrapped
+        self._thread = thread
+
+    def _call(self, method, *args, **kwargs):
+        return self._thread.call(
+                getattr(self._wrapped, method), *args, **kwargs
+        )
+
+    @property
+    def name(self):
+        return self._wrapped.name
+
+    def line(self, command, *args):
+        """The nft command line for command, so sync objects can be added to
+        a Script."""
+        return self._wrapped.line(command, *args)
+
+    def load_line(self):
+        """The nft command line load sends."""
+        return self._wrapped.load_line()
+
+    def __str__(self):
+        return str(self._wrapped)
+
+
+def _unwrap(value):
+    return value._wrapped if isinstance(value, _SyncWrapper) else value
+
+
+class SyncRule(_SyncWrapper):
+    @property
+    def handle(self):
+        return self._wrapped.handle
+
+    @property
+    def statement(self):
+        return self._wrapped.statement
+
+    def insert_line(self, before=None):
+        """The nft command line insert sends."""
+        return self._wrapped.insert_line(_unwrap(before))
+
+    def append_line(self, after=None):
+        """The nft command line append sends."""
+        return self._wrapped.append_line(_unwrap(after))
+
+    def insert(self, before=None):
+        """Add the rule at the top of the chain if before is None,
+            otherwise append before the rule passed in the before argument."""
+        self._call('insert', _unwrap(before))
+
+    def append(self, after=None):
+        """Add the rule at the bottom of the chain if after is None,
+            otherwise append after the rule passed in the after argument."""
+        self._call('append', _unwrap(after))
+
+    def delete(self):
+        """Delete the specified rule."""
+        self._call('delete')
+
+    def replace(self, statement):
+        """Replace the rules statement."""
+        self._call('replace', statement)
+
+
+class SyncChain(_SyncWrapper):
+    def flush(self):
+        """Flush all rules of the chain."""
+        self._call('flush')
+
+    def delete(self):
+        """Delete the chain, any subsequent calls to this chain will fail."""
+        self._call('delete')
+
+    def list(self):
+        """List all rules of the specified chain."""
+        return self._call('list')
+
+    def insert_rule(self, statement, before=None):
+        """Add the rule at the top of the chain if before is None,
+            otherwise append before the rule passed in the before argument."""
+        rule = self._call('insert_rule', statement, _unwrap(before))
+        return SyncRule(rule, self._thread)
+
+    def append_rule(self, statement, after=None):
+        """Add the rule at the bottom of the chain if after is None,
+            otherwise append after the rule passed in the after argument."""
+        rule = self._call('append_rule', statement, _unwrap(after))
+        return SyncRule(rule, self._thread)
+
+    def profile(self):
+        """Get the number of packets that have matched each rule with a
+        counter, as a dict of rule handle to packets."""
+        return self._call('profile')
+
+    def reorder_by_hits(self):
+        """Move the most matched rules earlier in the chain, see
+        Chain.reorder_by_hits."""
+        return self._call('reorder_by_hits')
+
+    @staticmethod
+    async def _rule_by_handle(chain, handle):
+        return chain.rule_by_handle(handle)
+
+    @staticmethod
+    async def _rules(chain):
+        return list(chain)
+
+    def rule_by_handle(self, handle):
+        """Get a rule added through this chain by its handle, returns None if
+        there is no such rule."""
+        rule = self._thread.call(self._rule_by_handle, self._wrapped, handle)
+        return None if rule is None else SyncRule(rule, self._thread)
+
+    @staticmethod
+    async def _rule_at(chain, position):
+        return chain.rule_at(position)
+
+    def rule_at(self, position):
+        """Get a rule added through this chain by its position among those
+        rules (0 is the top), raises IndexError if there is no such rule."""
+        rule = self._thread.call(self._rule_at, self._wrapped, position)
+        return SyncRule(rule, self._thread)
+
+    def __iter__(self):
+        """Iterate over the rules added through this chain, in chain order."""
+        rules = self._thread.call(self._rules, self._wrapped)
+        return (SyncRule(rule, self._thread) for rule in rules)
+
+    def offload_established(self, flowtable, *args, **kwargs):
+        """Add a flow offload rule for established connections, takes the
+        same arguments as BaseChain.offload_established."""
+        rule = self._call(
+                'offload_established', _unwrap(flowtable), *args, **kwargs
+        )
+        return SyncRule(rule, self._thread)
+
+
+class SyncSet(_SyncWrapper):
+    def flush(self):
+        """Flush all elements of the set."""
+        self._call('flush')
+
+    def delete(self):
+        """Delete the set, any subsequent calls to this set will fail."""
+        self._call('delete')
+
+    def list(self):
+        """List all elements of the set."""
+        return self._call('list')
+
+    def add_elements(self, elements):
+        """Add a list of elements to the set."""
+        self._call('add_elements', elements)
+
+    def remove_elements(self, elements):
+        """Remove a list of elements from the set."""
+        self._call('remove_elements', elements)
+
+
+class SyncCounter(_SyncWrapper):
+    def delete(self):
+        """Delete the counter, any subsequent calls to this counter will
+        fail."""
+        self._call('delete')
+
+    def get(self):
+        """Get the value of the counter."""
+        return self._call('get')
+
+    def reset(self):
+        """Reset the counter."""
+        return self._call('reset')
+
+
+class SyncFlowtable(_SyncWrapper):
+    def delete(self):
+        """Delete the flowtable."""
+        self._call('delete')
+
+    def list(self):
+        """List the flowtable."""
+        return self._call('list')
+
+    def get(self):
+        """Get the flowtable's configuration."""
+        return self._call('get')
+
+
+class SyncTable(_SyncWrapper):
+    def flush(self):
+        """Flush all chains and rules in the table."""
+        self._call('flush')
+
+    def delete(self):
+        """Delete the table, any subsequent calls to this table will fail."""
+        self._call('delete')
+
+    def list(self):
+        """List all chains and rules of the specified table."""
+        return self._call('list')
+
+    def chain(self, name, flush_existing=False, profiling=False):
+        """Create a new (or load an existing) Regular Chain."""
+        chain = self._call('chain', name, flush_existing, profiling)
+        return SyncChain(chain, self._thread)
+
+    def base_chain(self, name, type_, hook, *args, **kwargs):
+        """Create a new (or load an existing) Base Chain, takes the same
+        arguments as Table.base_chain."""
+        chain = self._call('base_chain', name, type_, hook, *args, **kwargs)
+        return SyncChain(chain, self._thread)
+
+    def set(self, name, type_, *args, **kwargs):
+        """Create a new or load an existing set, takes the same arguments as
+        Table.set."""
+        set_ = self._call('set', name, type_, *args, **kwargs)
+        return SyncSet(set_, self._thread)
+
+    def counter(self, name, flush_existing=False):
+        """Create a new (or load an existing) Counter."""
+        counter = self._call('counter', name, flush_existing)
+        return SyncCounter(counter, self._thread)
+
+    def flowtable(self, name, *args, **kwargs):
+        """Create a new (or load an existing) Flowtable, takes the same
+        arguments as Table.flowtable."""
+        flowtable = self._call('flowtable', name, *args, **kwargs)
+        return SyncFlowtable(flowtable, self._thread)
+
+
+class SyncRuleset(_SyncWrapper):
+    def __init__(self, thread=None):
+        """Blocking version of Ruleset, safe to share between threads.
+
+        All calls are run on a NftThread (a private one is started if thread
+        is None) so every thread using this ruleset shares one nft process."""
+
+        self._owns_thread = thread is None
+        thread = NftThread() if thread is None else thread
+
+        super().__init__(thread.call(self._create, thread.loop), thread)
+
+    @staticmethod
+    async def _create(loop):
+        # Nft binds its Event and Lock to the loop, so the Ruleset has
+        # to be created from within the loop thread.
+        return Ruleset(loop)
+
+    @property
+    def name(self):
+        return 'ruleset'
+
+    def cmd(self, command, *args):
+        return self._call('cmd', command, *args)
+
+    def flush(self):
+        """Clear the entire ruleset."""
+        self._call('flush')
+
+    def list(self):
+        """List the ruleset contents."""
+        return self._call('list')
+
+    def check(self, script):
+        """Check a Script with nft --check, raises ValidationError."""
+        self._call('check', script)
+
+    def table(self, name, flush_existing=False):
+        """Create a new (or load an existing) Table."""
+        table = self._call('table', name, flush_existing)
+        return SyncTable(table, self._thread)
+
+    def close(self):
+        """Stop the nft process, and the NftThread if it was started by this
+        ruleset."""
+
+        self._thread.call(self._wrapped.nft.close)
+        if self._owns_thread:
+            self._thread.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
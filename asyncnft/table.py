@@ -1,12 +1,15 @@
 # Copyright: 2018, CCX Technologies
 
 import re
+import sys
 import asyncio
+import weakref
 
 from .chain import Chain
 from .chain import BaseChain
 from .set import Set
 from .counter import Counter
+from .flowtable import Flowtable
 from .nft import wait_intialized
 
 chain_pattern = re.compile(
@@ -25,10 +28,20 @@ class Table:
         self.initialized = asyncio.Event()
 
         self.nft = ruleset.nft
-        self.name = name
+        self.name = sys.intern(name)
+
+        self._chains = weakref.WeakValueDictionary()
+
+    def line(self, command, *args):
+        """The nft command line for command."""
+        return ' '.join((command, 'table', self.name, *args))
 
     async def cmd(self, command, *args):
-        return await self.nft.cmd(command, 'table', self.name, *args)
+        return await self.nft.cmd(self.line(command, *args))
+
+    def load_line(self):
+        """The nft command line load sends."""
+        return self.line('add')
 
     async def load(self, flush_existing=False):
         """Load the table, must be called before calling any other methods.
@@ -39,7 +52,7 @@ class Table:
         if self.initialized.is_set():
             raise RuntimeError("Already Initialized")
 
-        response = await self.cmd('add')
+        response = await self.nft.cmd(self.load_line())
         if flush_existing and not response:
             await self.cmd('flush')
 
@@ -59,13 +72,14 @@ class Table:
         self.initialized.clear()
 
     @wait_intialized
-    async def chain(self, name, flush_existing=False):
+    async def chain(self, name, flush_existing=False, profiling=False):
         """Create a new (or load an existing) Regular Chain.
 
         If flush_existing is True and the table already exists it will be
-        flushed."""
-        chain = Chain(name, self)
+        flushed, if profiling is True rules get anonymous counters."""
+        chain = Chain(name, self, profiling)
         await chain.load(flush_existing)
+        self._chains[chain.name] = chain
         return chain
 
     @wait_intialized
@@ -77,14 +91,18 @@ class Table:
             device=None,
             priority=0,
             policy='accept',
-            flush_existing=False
+            flush_existing=False,
+            profiling=False
     ):
         """Create a new (or load an existing) Base Chain.
 
         If flush_existing is True and the table already exists it will be
-        flushed."""
-        chain = BaseChain(name, self, type_, hook, device, priority, policy)
+        flushed, if profiling is True rules get anonymous counters."""
+        chain = BaseChain(
+                name, self, type_, hook, device, priority, policy, profiling
+        )
         await chain.load(flush_existing)
+        self._chains[chain.name] = chain
         return chain
 
     @wait_intialized
@@ -128,6 +146,15 @@ class Table:
         await counter.load(flush_existing)
         return counter
 
+    @wait_intialized
+    async def flowtable(
+            self, name, hook='ingress', priority=0, devices=None, counter=False
+    ):
+        """Create a new (or load an existing) Flowtable."""
+        flowtable = Flowtable(name, self, hook, priority, devices, counter)
+        await flowtable.load()
+        return flowtable
+
     async def list(self):
         """List all chains and rules of the specified table."""
         return await self.cmd('list')
@@ -151,5 +178,9 @@ class Table:
                         jump_match['handle']
                 )
 
+                src = self._chains.get(src_chain)
+                if src is not None:
+                    src.rules.discard(int(jump_match['handle']))
+
     def __str__(self):
         return self.name
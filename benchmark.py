@@ -0,0 +1,45 @@
+#!/usr/bin/python
+
+from asyncnft.table import Table
+from asyncnft.chain import Chain
+from asyncnft.rule import Rule
+import tracemalloc
+import random
+import time
+
+
+class _Ruleset:
+    nft = None
+
+
+count = 100000
+
+table = Table("test_table", _Ruleset())
+chain = Chain("test_chain", table)
+statements = [f"tcp dport {port} accept" for port in range(count)]
+
+tracemalloc.start()
+before = tracemalloc.take_snapshot()
+
+for handle, statement in enumerate(statements, 1):
+    rule = Rule(statement, chain)
+    rule.handle = handle
+    chain.rules.append(rule)
+
+after = tracemalloc.take_snapshot()
+tracemalloc.stop()
+
+size = sum(s.size_diff for s in after.compare_to(before, 'filename'))
+print(f"{count} rules: {size / 2**20:.2f} MiB, {size / count:.0f} B/rule")
+
+handles = random.sample(range(1, count + 1), 10000)
+start = time.perf_counter()
+for handle in handles:
+    chain.rule_by_handle(handle)
+elapsed = time.perf_counter() - start
+print(f"rule_by_handle: {elapsed / len(handles) * 1e9:.0f} ns/lookup")
+
+start = time.perf_counter()
+ordered = sum(1 for _ in chain)
+elapsed = time.perf_counter() - start
+print(f"iterate {ordered} rules: {elapsed * 1e3:.1f} ms")
@@ -0,0 +1,36 @@
+import os
+import sys
+
+import pytest
+
+from asyncnft.nft import Nft
+
+fake_nft_path = os.path.join(os.path.dirname(__file__), 'fake_nft.py')
+
+
+@pytest.fixture
+def fake_nft(monkeypatch):
+    """Run tests/fake_nft.py instead of nft, returns a list of the argv of
+    every nft started."""
+
+    started = []
+
+    def argv(self, *options):
+        netns = [] if self.netns is None else ['--netns', self.netns]
+        started.append([*netns, *options])
+        return [sys.executable, fake_nft_path, *netns, *options]
+
+    monkeypatch.setattr(Nft, 'argv', argv)
+    return started
+
+
+@pytest.fixture
+def netns(tmp_path):
+    """Returns a function that creates a new (fake) network namespace."""
+
+    def create(name):
+        path = tmp_path / name
+        path.touch()
+        return str(path)
+
+    return create
@@ -0,0 +1,418 @@
+#!/usr/bin/python
+"""A stand-in for nft used by the tests.
+
+Supports the subset of commands asyncnft sends, in interactive mode (with
+--echo --handle --interactive) or as a script with --check --file -.
+
+With --netns PATH the fake plays the network namespace at PATH: the ruleset
+is loaded from and saved to that file (as json), so every nft started in
+the same namespace sees the same ruleset. Like nsenter it fails if PATH
+doesn't exist."""
+
+import os
+import re
+import sys
+import copy
+import json
+
+no_such_file = "Could not process rule: No such file or directory"
+
+
+class NftError(Exception):
+    pass
+
+
+def split_commands(line):
+    commands, depth, start = [], 0, 0
+    for i, char in enumerate(line):
+        if char == '{':
+            depth += 1
+        elif char == '}':
+            depth -= 1
+        elif (char == ';') and not depth:
+            commands.append(line[start:i].strip())
+            start = i + 1
+    commands.append(line[start:].strip())
+    return [c for c in commands if c]
+
+
+def braces(text):
+    match = re.search(r"{(.*)}", text)
+    return match.group(1).strip() if match else ''
+
+
+def items(text):
+    return [i.strip() for i in braces(text).split(',') if i.strip()]
+
+
+def priority_name(priority):
+    try:
+        priority = int(priority)
+    except ValueError:
+        return priority
+    if not priority:
+        return 'filter'
+    return f"filter {'+' if priority > 0 else '-'} {abs(priority)}"
+
+
+class Ruleset:
+    def __init__(self, state=None):
+        self.state = state or {'handle': 0, 'tables': {}}
+
+    def next_handle(self):
+        self.state['handle'] += 1
+        return self.state['handle']
+
+    def table(self, name):
+        try:
+            return self.state['tables'][name]
+        except KeyError:
+            raise NftError(no_such_file)
+
+    def obj(self, kind, table, name):
+        try:
+            return self.table(table)[kind][name]
+        except KeyError:
+            raise NftError(no_such_file)
+
+    def run(self, line):
+        return ''.join(self.command(c) for c in split_commands(line))
+
+    def command(self, command):
+        words = command.split()
+        if len(words) < 2:
+            raise NftError(f"syntax error, unexpected {command}")
+
+        verb, kind, args = words[0], words[1], words[2:]
+        method = getattr(self, f"{verb}_{kind}", None)
+        if method is None:
+            raise NftError(f"syntax error, unexpected {verb} {kind}")
+
+        return method(args, command)
+
+    # -- ruleset
+
+    def list_ruleset(self, args, command):
+        return ''.join(self.format_table(t) for t in self.state['tables'])
+
+    def flush_ruleset(self, args, command):
+        self.state['tables'].clear()
+        return ''
+
+    # -- tables
+
+    def add_table(self, args, command):
+        self.state['tables'].setdefault(
+                args[0], {
+                        'chains': {},
+                        'sets': {},
+                        'flowtables': {},
+                        'counters': {},
+                }
+        )
+        return f"{command}\n"
+
+    def delete_table(self, args, command):
+        self.table(args[0])
+        del self.state['tables'][args[0]]
+        return ''
+
+    def flush_table(self, args, command):
+        for chain in self.table(args[0])['chains'].values():
+            chain['rules'] = []
+        return ''
+
+    def list_table(self, args, command):
+        self.table(args[0])
+        return self.format_table(args[0])
+
+    # -- chains
+
+    def add_chain(self, args, command):
+        chains = self.table(args[0])['chains']
+        if args[1] not in chains:
+            chains[args[1]] = {
+                    'handle': self.next_handle(),
+                    'spec': braces(command),
+                    'rules': [],
+            }
+        return f"{command}\n"
+
+    def delete_chain(self, args, command):
+        self.obj('chains', args[0], args[1])
+        del self.table(args[0])['chains'][args[1]]
+        return ''
+
+    def flush_chain(self, args, command):
+        self.obj('chains', args[0], args[1])['rules'] = []
+        return ''
+
+    def list_chain(self, args, command):
+        self.obj('chains', args[0], args[1])
+        return self.format_table(args[0], chains=[args[1]])
+
+    # -- rules
+
+    def _rule(self, args, command, insert):
+        rules = self.obj('chains', args[0], args[1])['rules']
+        statement = args[2:]
+
+        index = 0 if insert else len(rules)
+        if statement[:1] == ['position']:
+            handles = [h for h, _ in rules]
+            try:
+                index = handles.index(int(statement[1])) + (not insert)
+            except ValueError:
+                raise NftError(no_such_file)
+            statement = statement[2:]
+
+        if not statement:
+            raise NftError("syntax error, unexpected end of file")
+
+        handle = self.next_handle()
+        rules.insert(index, [handle, ' '.join(statement)])
+        return f"{command} # handle {handle}\n"
+
+    def add_rule(self, args, command):
+        return self._rule(args, command, False)
+
+    def insert_rule(self, args, command):
+        return self._rule(args, command, True)
+
+    def _find_rule(self, args):
+        rules = self.obj('chains', args[0], args[1])['rules']
+        for rule in rules:
+            if (args[2:3] == ['handle']) and (rule[0] == int(args[3])):
+                return rules, rule
+        raise NftError(no_such_file)
+
+    def delete_rule(self, args, command):
+        rules, rule = self._find_rule(args)
+        rules.remove(rule)
+        return ''
+
+    def replace_rule(self, args, command):
+        _, rule = self._find_rule(args)
+        rule[1] = ' '.join(args[4:])
+        return f"{command}\n"
+
+    # -- sets
+
+    def add_set(self, args, command):
+        sets = self.table(args[0])['sets']
+        if args[1] not in sets:
+            spec = braces(command)
+            match = re.search(r"elements = ({[^}]*})", spec)
+            sets[args[1]] = {
+                    'spec': re.sub(r"\s*elements = {[^}]*};", '', spec),
+                    'elements': items(match.group(1)) if match else [],
+            }
+        return f"{command}\n"
+
+    def delete_set(self, args, command):
+        self.obj('sets', args[0], args[1])
+        del self.table(args[0])['sets'][args[1]]
+        return ''
+
+    def flush_set(self, args, command):
+        self.obj('sets', args[0], args[1])['elements'] = []
+        return ''
+
+    def list_set(self, args, command):
+        self.obj('sets', args[0], args[1])
+        return self.format_table(args[0], sets=[args[1]])
+
+    def add_element(self, args, command):
+        set_ = self.obj('sets', args[0], args[1])
+        for element in items(command):
+            if element not in set_['elements']:
+                set_['elements'].append(element)
+        return f"{command}\n"
+
+    def delete_element(self, args, command):
+        set_ = self.obj('sets', args[0], args[1])
+        for element in items(command):
+            if element not in set_['elements']:
+                raise NftError(no_such_file)
+            set_['elements'].remove(element)
+        return ''
+
+    # -- counters
+
+    def add_counter(self, args, command):
+        self.table(args[0])['counters'].setdefault(args[1], [0, 0])
+        return f"{command}\n"
+
+    def delete_counter(self, args, command):
+        self.obj('counters', args[0], args[1])
+        del self.table(args[0])['counters'][args[1]]
+        return ''
+
+    def reset_counter(self, args, command):
+        self.obj('counters', args[0], args[1])[:] = [0, 0]
+        return ''
+
+    def list_counter(self, args, command):
+        packets, bytes_ = self.obj('counters', args[0], args[1])
+        return (
+                f"table ip {args[0]} {{\n\tcounter {args[1]} {{\n"
+                f"\t\tpackets {packets} bytes {bytes_}\n\t}}\n}}\n"
+        )
+
+    # -- flowtables
+
+    def add_flowtable(self, args, command):
+        flowtables = self.table(args[0])['flowtables']
+        if args[1] not in flowtables:
+            spec = braces(command)
+            hook = re.search(r"hook (\S+) priority ([^;]+);", spec)
+            if not hook:
+                raise NftError("syntax error, unexpected '}'")
+            devices = re.search(r"devices = ({[^}]*})", spec)
+            flowtables[args[1]] = {
+                    'handle': self.next_handle(),
+                    'hook': hook.group(1),
+                    'priority': hook.group(2).strip(),
+                    'devices': items(devices.group(1)) if devices else [],
+                    'counter': bool(re.search(r"(^|; )counter;", spec)),
+            }
+        return f"{command}\n"
+
+    def delete_flowtable(self, args, command):
+        self.obj('flowtables', args[0], args[1])
+        del self.table(args[0])['flowtables'][args[1]]
+        return ''
+
+    def list_flowtable(self, args, command):
+        self.obj('flowtables', args[0], args[1])
+        return self.format_table(args[0], flowtables=[args[1]])
+
+    # -- listings
+
+    def format_table(self, name, chains=None, sets=None, flowtables=None):
+        table = self.table(name)
+        whole = (chains is None) and (sets is None) and (flowtables is None)
+
+        lines = [f"table ip {name} {{"]
+
+        for set_name in table['sets'] if whole else (sets or []):
+            set_ = table['sets'][set_name]
+            lines.append(f"\tset {set_name} {{")
+            for part in set_['spec'].split(';'):
+                if part.strip():
+                    lines.append(f"\t\t{part.strip()}")
+            if set_['elements']:
+                lines.append(
+                        f"\t\telements = {{ {', '.join(set_['elements'])} }}"
+                )
+            lines.append("\t}")
+
+        for ft_name in table['flowtables'] if whole else (flowtables or []):
+            flowtable = table['flowtables'][ft_name]
+            lines.append(
+                    f"\tflowtable {ft_name} {{ # handle {flowtable['handle']}"
+            )
+            lines.append(
+                    f"\t\thook {flowtable['hook']} priority"
+                    f" {priority_name(flowtable['priority'])}"
+            )
+            if flowtable['devices']:
+                devices = ', '.join(flowtable['devices'])
+                lines.append(f"\t\tdevices = {{ {devices} }}")
+            if flowtable['counter']:
+                lines.append("\t\tcounter")
+            lines.append("\t}")
+
+        for chain_name in table['chains'] if whole else (chains or []):
+            chain = table['chains'][chain_name]
+            lines.append(f"\tchain {chain_name} {{ # handle {chain['handle']}")
+            if chain['spec']:
+                lines.append(f"\t\t{chain['spec']}")
+            for handle, statement in chain['rules']:
+                statement = re.sub(
+                        r"\bcounter\b(?! name)", "counter packets 0 bytes 0",
+                        statement
+                )
+                lines.append(f"\t\t{statement} # handle {handle}")
+            lines.append("\t}")
+
+        lines.append("}")
+        return ''.join(f"{line}\n" for line in lines)
+
+
+def load(netns):
+    if netns is None:
+        return Ruleset()
+
+    with open(netns) as f:
+        text = f.read()
+    return Ruleset(json.loads(text) if text.strip() else None)
+
+
+def save(netns, ruleset):
+    if netns is not None:
+        with open(netns, 'w') as f:
+            json.dump(ruleset.state, f)
+
+
+def interactive(netns):
+    out = sys.stdout
+    out.write("nft> ")
+    out.flush()
+
+    ruleset = load(netns)
+    for line in sys.stdin:
+        out.write(line)
+        line = line.strip()
+
+        if line:
+            if netns is not None:
+                ruleset = load(netns)
+            attempt = Ruleset(copy.deepcopy(ruleset.state))
+            try:
+                out.write(attempt.run(line))
+            except NftError as exc:
+                out.write(f"Error: {exc}\n")
+            else:
+                ruleset = attempt
+                save(netns, ruleset)
+
+        out.write("nft> ")
+        out.flush()
+
+
+def check(netns):
+    ruleset = load(netns)
+    failed = False
+
+    for number, line in enumerate(sys.stdin, 1):
+        line = line.rstrip('\n')
+        if not line.strip():
+            continue
+        try:
+            ruleset.run(line)
+        except NftError as exc:
+            print(f"/dev/stdin:{number}:1-{len(line)}: Error: {exc}")
+            print(line)
+            failed = True
+
+    return 1 if failed else 0
+
+
+def main(argv):
+    netns = None
+    if argv[:1] == ['--netns']:
+        netns, argv = argv[1], argv[2:]
+        if not os.path.exists(netns):
+            print(f"nsenter: cannot open {netns}: No such file or directory")
+            return 1
+
+    if '--check' in argv:
+        return check(netns)
+
+    interactive(netns)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,152 @@
+import asyncio
+
+import pytest
+
+from asyncnft.chain import Chain
+from asyncnft.table import Table
+
+
+class StubNft:
+    def __init__(self, hits):
+        self.hits = hits
+        self.handle = 10
+        self.rules = []
+        self.sent = []
+
+    async def cmd(self, *command):
+        line = ' '.join(command)
+        self.sent.append(line)
+
+        if line.startswith('add rule'):
+            self.handle += 1
+            self.rules.append((self.handle, line.split(' ', 4)[4]))
+            return f"{line} # handle {self.handle}\n"
+
+        if line.startswith('list chain'):
+            lines = ["table ip filter {", "\tchain input { # handle 1"]
+            for handle, statement in self.rules:
+                packets = self.hits.get(handle, 0)
+                statement = statement.replace(
+                        'counter', f"counter packets {packets} bytes 0"
+                )
+                lines.append(f"\t\t{statement} # handle {handle}")
+            lines += ["\t}", "}"]
+            return '\n'.join(lines) + '\n'
+
+        response = ''
+        for command in line.split('; '):
+            if command.startswith('insert'):
+                self.handle += 1
+                response += f"{command} # handle {self.handle}\n"
+        return response
+
+
+class _Ruleset:
+    def __init__(self, nft):
+        self.nft = nft
+
+
+statements = [
+        "tcp dport 1 accept",
+        "tcp dport 2 accept",
+        "tcp dport 3 accept",
+        "tcp dport 4 drop",
+        "tcp dport 5 drop",
+        "ip saddr 10.0.0.1 log",
+        "tcp dport 6 accept",
+        "tcp dport 7 accept",
+]
+
+
+async def make_chain(nft):
+    chain = Chain('input', Table('filter', _Ruleset(nft)), profiling=True)
+    chain.initialized.set()
+    for statement in statements:
+        await chain.append_rule(statement)
+    return chain
+
+
+def test_reorder_by_hits():
+    nft = StubNft({11: 1, 12: 5, 13: 10, 14: 1, 15: 3, 17: 0, 18: 7})
+
+    async def main():
+        chain = await make_chain(nft)
+        assert [r.statement for r in chain][0] == "tcp dport 1 counter accept"
+
+        assert await chain.profile() == {
+                11: 1, 12: 5, 13: 10, 14: 1, 15: 3, 16: 0, 17: 0, 18: 7
+        }
+
+        result = await chain.reorder_by_hits()
+        assert result['before'] == pytest.approx(116 / 27)
+        assert result['after'] == pytest.approx(89 / 27)
+
+        assert nft.sent[-1] == '; '.join(
+                [
+                        "insert rule filter input position 11"
+                        " tcp dport 3 counter accept",
+                        "insert rule filter input position 11"
+                        " tcp dport 2 counter accept",
+                        "insert rule filter input position 11"
+                        " tcp dport 1 counter accept",
+                        "delete rule filter input handle 11",
+                        "delete rule filter input handle 12",
+                        "delete rule filter input handle 13",
+                        "insert rule filter input position 14"
+                        " tcp dport 5 counter drop",
+                        "insert rule filter input position 14"
+                        " tcp dport 4 counter drop",
+                        "delete rule filter input handle 14",
+                        "delete rule filter input handle 15",
+                        "insert rule filter input position 17"
+                        " tcp dport 7 counter accept",
+                        "insert rule filter input position 17"
+                        " tcp dport 6 counter accept",
+                        "delete rule filter input handle 17",
+                        "delete rule filter input handle 18",
+                ]
+        )
+
+        assert [(r.handle, r.statement.split()[2]) for r in chain] == [
+                (19, '3'), (20, '2'), (21, '1'), (22, '5'), (23, '4'),
+                (16, '10.0.0.1'), (24, '7'), (25, '6')
+        ]
+        assert chain.rule_by_handle(19).statement == (
+                "tcp dport 3 counter accept"
+        )
+        assert chain.rule_by_handle(13) is None
+
+    asyncio.run(main())
+
+
+def test_reorder_by_hits_already_ordered():
+    nft = StubNft({11: 9, 12: 5, 13: 1})
+
+    async def main():
+        chain = await make_chain(nft)
+        sent = len(nft.sent)
+
+        result = await chain.reorder_by_hits()
+        assert result['before'] == result['after']
+        assert len(nft.sent) == sent + 1
+
+    asyncio.run(main())
+
+
+def test_reorder_by_hits_skips_unknown_rules():
+    nft = StubNft({11: 1, 12: 5, 13: 50})
+
+    async def main():
+        chain = await make_chain(nft)
+
+        # a rule not added through this chain splits the run
+        nft.rules.insert(1, (99, "tcp dport 99 counter accept"))
+        nft.hits[99] = 100
+
+        await chain.reorder_by_hits()
+        assert 'position 12 tcp dport 3' in nft.sent[-1]
+        assert 'position 11' not in nft.sent[-1]
+        assert 'tcp dport 99' not in nft.sent[-1]
+        assert [r.statement.split()[2] for r in chain][:3] == ['1', '3', '2']
+
+    asyncio.run(main())
@@ -0,0 +1,196 @@
+import sys
+import time
+import asyncio
+
+import pytest
+
+from asyncnft import Ruleset
+from asyncnft import Script
+from asyncnft import ValidationError
+from asyncnft.check import Validator
+from asyncnft.counter import Counter
+from asyncnft.chain import BaseChain
+from asyncnft.flowtable import Flowtable
+from asyncnft.rule import Rule
+from asyncnft.set import Set
+from asyncnft.table import Table
+
+
+class _Ruleset:
+    nft = None
+
+
+def make_script():
+    table = Table('filter', _Ruleset())
+    chain = BaseChain('input', table, 'filter', 'input')
+    rules = [Rule(f"tcp dport {port} accept", chain) for port in (22, 80)]
+
+    script = Script()
+    script.load(table)
+    script.load(chain)
+    for rule in rules:
+        script.append_rule(rule)
+    return script, rules
+
+
+class StubValidator(Validator):
+    def __init__(self, returncode=0, output=''):
+        super().__init__(None)
+        self.returncode = returncode
+        self.output = output
+        self.runs = 0
+
+    async def _run(self, text):
+        self.runs += 1
+        return self.returncode, self.output
+
+
+def test_script_matches_what_load_and_insert_send(fake_nft):
+    async def main():
+        ruleset = Ruleset()
+        sent, cmd = [], ruleset.nft.cmd
+
+        async def recording_cmd(*command):
+            sent.append(' '.join(command))
+            return await cmd(*command)
+
+        ruleset.nft.cmd = recording_cmd
+
+        table = Table('filter', ruleset)
+        objects = [
+                table,
+                BaseChain('input', table, 'filter', 'input', priority=10),
+                Set('blocked', table, 'ipv4_addr', elements=['10.0.0.1']),
+                Counter('dropped', table),
+                Flowtable('ft', table, devices=['eth0']),
+        ]
+
+        script = Script()
+        for obj in objects:
+            script.load(obj)
+            await obj.load()
+
+        chain = objects[1]
+        first = Rule('tcp dport 22 accept', chain)
+        second = Rule('tcp dport 80 accept', chain)
+
+        script.append_rule(first)
+        await first.append()
+        script.insert_rule(second, before=first)
+        await second.insert(first)
+
+        assert script.lines == sent
+        assert script.origins == [*objects, first, second]
+        assert 'position' in script.lines[-1]
+        assert '{ type filter hook input' in script.lines[1]
+        assert 'elements = { 10.0.0.1 }' in script.lines[2]
+
+        await ruleset.nft.close()
+
+    asyncio.run(main())
+
+
+def test_errors_map_to_origin():
+    script, rules = make_script()
+    validator = StubValidator(
+            1, "/dev/stdin:3:1-26: Error: syntax error\n"
+            "add rule filter input tcp dport 22 accept\n"
+            "^^^^^^^^^^^^^^^^^^^^^^^^^^\n"
+            "/dev/stdin:9:1-3: Error: line past the end\n"
+    )
+
+    with pytest.raises(ValidationError) as error:
+        asyncio.run(validator.check(script))
+
+    assert error.value.errors == [
+            (rules[0], 3, script.lines[2], 'syntax error'),
+            (None, 9, None, 'line past the end'),
+    ]
+    assert str(error.value).startswith(f"3: {script.lines[2]} => syntax")
+
+
+def test_failure_without_error_lines():
+    script, _ = make_script()
+    validator = StubValidator(1, "nsenter: cannot open ns\n")
+
+    with pytest.raises(ValidationError) as error:
+        asyncio.run(validator.check(script))
+
+    assert error.value.errors == [
+            (None, None, None, "nsenter: cannot open ns")
+    ]
+
+
+def test_only_passing_scripts_are_cached():
+    script, _ = make_script()
+
+    validator = StubValidator()
+    asyncio.run(validator.check(script))
+    asyncio.run(validator.check(script))
+    assert validator.runs == 1
+
+    validator = StubValidator(1, "/dev/stdin:1:1-3: Error: failed\n")
+    for _ in range(2):
+        with pytest.raises(ValidationError):
+            asyncio.run(validator.check(script))
+    assert validator.runs == 2
+
+
+def test_cache_is_bounded():
+    scripts = [make_script()[0], Script()]
+    validator = StubValidator()
+    validator.cache_size = 1
+
+    for script in (scripts[0], scripts[1], scripts[0]):
+        asyncio.run(validator.check(script))
+    assert validator.runs == 3
+
+
+class _SleepingNft:
+    def argv(self, *options):
+        return [sys.executable, '-c', 'import time; time.sleep(30)']
+
+
+def test_hung_check_is_killed():
+    async def main():
+        validator = Validator(_SleepingNft(), concurrency=1)
+        validator.timeout = 0.2
+
+        script, _ = make_script()
+        start = time.monotonic()
+        for _ in range(2):
+            with pytest.raises(asyncio.TimeoutError):
+                await validator.check(script)
+        assert time.monotonic() - start < 5
+
+    asyncio.run(main())
+
+
+def test_check_against_fake_nft(fake_nft):
+    async def main():
+        ruleset = Ruleset()
+        table = Table('filter', ruleset)
+        missing = BaseChain('missing', table, 'filter', 'input')
+        rule = Rule('tcp dport 22 accept', missing)
+
+        script = Script()
+        script.load(table)
+        script.append_rule(rule)
+
+        with pytest.raises(ValidationError) as error:
+            await ruleset.check(script)
+        assert error.value.errors[0][:2] == (rule, 2)
+
+        script = Script()
+        script.load(table)
+        script.load(missing)
+        script.append_rule(rule)
+        await ruleset.check(script)
+        await ruleset.check(script)
+
+        checks = [argv for argv in fake_nft if '--check' in argv]
+        assert len(checks) == 2
+
+        await ruleset.nft.close()
+
+    asyncio.run(main())
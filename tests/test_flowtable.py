@@ -0,0 +1,99 @@
+import asyncio
+
+from asyncnft import Ruleset
+from asyncnft.flowtable import Flowtable
+from asyncnft.table import Table
+
+listing = """table inet filter {
+\tflowtable ft { # handle 7
+\t\thook ingress priority filter + 10
+\t\tdevices = { eth0, eth1 }
+\t\tcounter
+\t}
+}
+"""
+
+
+class _Ruleset:
+    nft = None
+
+
+def record(nft):
+    sent, cmd = [], nft.cmd
+
+    async def recording_cmd(*command):
+        sent.append(' '.join(command))
+        return await cmd(*command)
+
+    nft.cmd = recording_cmd
+    return sent
+
+
+def test_get_parses_listing():
+    async def main():
+        flowtable = Flowtable('ft', Table('filter', _Ruleset()))
+        flowtable.initialized.set()
+
+        async def list_():
+            return listing
+
+        flowtable.list = list_
+
+        assert await flowtable.get() == {
+                'handle': 7,
+                'hook': 'ingress',
+                'priority': 'filter + 10',
+                'devices': ['eth0', 'eth1'],
+                'counter': True,
+        }
+
+    asyncio.run(main())
+
+
+def test_flowtable_and_offload(fake_nft):
+    async def main():
+        ruleset = Ruleset()
+        sent = record(ruleset.nft)
+
+        table = await ruleset.table('filter')
+        flowtable = await table.flowtable(
+                'ft', 'ingress', 10, ['eth0', 'eth1'], counter=True
+        )
+        plain = await table.flowtable('plain', devices=['eth2'])
+        chain = await table.base_chain('forward', 'filter', 'forward')
+
+        rule = await chain.offload_established(flowtable)
+        await chain.offload_established('plain', protocols=('tcp', ))
+
+        assert sent[1] == (
+                "add flowtable filter ft { hook ingress priority 10;"
+                " devices = { eth0, eth1 }; counter; }"
+        )
+        assert sent[2] == (
+                "add flowtable filter plain { hook ingress priority 0;"
+                " devices = { eth2 }; }"
+        )
+        assert rule.statement == (
+                "meta l4proto { tcp, udp } ct state established flow add @ft"
+        )
+        assert sent[-1].endswith(
+                "meta l4proto { tcp } ct state established flow add @plain"
+        )
+
+        info = await flowtable.get()
+        assert isinstance(info.pop('handle'), int)
+        assert info == {
+                'hook': 'ingress',
+                'priority': 'filter + 10',
+                'devices': ['eth0', 'eth1'],
+                'counter': True,
+        }
+        info = await plain.get()
+        assert (info['priority'], info['counter']) == ('filter', False)
+
+        await plain.delete()
+        assert 'flowtable plain' not in await table.list()
+
+        await ruleset.nft.close()
+
+    asyncio.run(main())
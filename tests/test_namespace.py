@@ -0,0 +1,168 @@
+import asyncio
+
+import pytest
+
+from asyncnft import NamespaceRulesetManager
+from asyncnft.nft import Nft
+
+
+async def create_set(ruleset):
+    table = await ruleset.table('filter')
+    await table.set('blocked', 'ipv4_addr')
+
+
+async def list_ruleset(ruleset):
+    return await ruleset.list()
+
+
+def interactive(started):
+    return [argv for argv in started if '--interactive' in argv]
+
+
+def test_sessions_are_started_lazily(fake_nft, netns):
+    async def main():
+        manager = NamespaceRulesetManager()
+        namespaces = [netns('a'), netns('b')]
+
+        manager.add(namespaces)
+        assert manager.namespaces == namespaces
+        assert manager.running == []
+        assert fake_nft == []
+
+        await manager.run(namespaces[0], create_set)
+        await manager.run(namespaces[0], list_ruleset)
+        assert manager.running == [namespaces[0]]
+        assert len(interactive(fake_nft)) == 1
+
+        await manager.close()
+
+    asyncio.run(main())
+
+
+def test_idle_sessions_are_evicted_lru(fake_nft, netns):
+    async def main():
+        manager = NamespaceRulesetManager(max_idle=2)
+        namespaces = [netns(f"ns{i}") for i in range(5)]
+
+        for path in namespaces:
+            await manager.run(path, create_set)
+
+        assert manager.running == namespaces[3:]
+        assert manager.namespaces == namespaces
+
+        await manager.run(namespaces[3], list_ruleset)
+        await manager.run(namespaces[0], list_ruleset)
+        assert manager.running == [namespaces[3], namespaces[0]]
+
+        # the restarted session sees the namespace's ruleset
+        listing = await manager.run(namespaces[0], list_ruleset)
+        assert 'set blocked' in listing
+        assert len(interactive(fake_nft)) == 6
+
+        await manager.close()
+
+    asyncio.run(main())
+
+
+def test_concurrency_is_bounded(fake_nft, netns):
+    active, peak = 0, 0
+
+    async def slow(ruleset):
+        nonlocal active, peak
+        active += 1
+        peak = max(peak, active)
+        await ruleset.list()
+        await asyncio.sleep(0.05)
+        active -= 1
+
+    async def main():
+        manager = NamespaceRulesetManager(concurrency=2)
+        manager.add([netns(f"ns{i}") for i in range(6)])
+
+        results = await manager.fan_out(slow)
+        assert list(results.values()) == [None] * 6
+
+        await manager.close()
+
+    asyncio.run(main())
+    assert peak == 2
+
+
+def test_fan_out_aggregates_errors(fake_nft, netns, tmp_path):
+    async def main():
+        manager = NamespaceRulesetManager(max_idle=1)
+        good = [netns('good1'), netns('good2')]
+        no_table = netns('no_table')
+        missing = str(tmp_path / 'missing')
+
+        for path in good:
+            await manager.run(path, create_set)
+        manager.add([no_table, missing])
+
+        results = await manager.add_elements(
+                'filter', 'blocked', ['10.0.0.1', '10.0.0.2']
+        )
+
+        assert list(results) == [*good, no_table, missing]
+        for path in good:
+            assert not isinstance(results[path], Exception)
+        assert isinstance(results[no_table], FileNotFoundError)
+        assert isinstance(results[missing], FileNotFoundError)
+
+        # a namespace that failed stays known and is retried next time
+        results = await manager.add_elements(
+                'filter', 'blocked', ['10.0.0.3'], namespaces=[missing]
+        )
+        assert isinstance(results[missing], FileNotFoundError)
+
+        listing = await manager.run(good[0], list_ruleset)
+        assert 'elements = { 10.0.0.1, 10.0.0.2 }' in listing
+
+        await manager.close()
+
+    asyncio.run(main())
+
+
+def test_dead_session_is_restarted(fake_nft, netns):
+    async def kill(ruleset):
+        ruleset.nft.nft.kill()
+        await ruleset.nft.nft.wait()
+
+    async def main():
+        manager = NamespaceRulesetManager()
+        path = netns('a')
+
+        await manager.run(path, create_set)
+        await manager.run(path, kill)
+
+        listing = await manager.run(path, list_ruleset)
+        assert 'set blocked' in listing
+        assert len(interactive(fake_nft)) == 2
+
+        await manager.close()
+
+    asyncio.run(main())
+
+
+def test_exited_nft_raises(fake_nft, netns):
+    async def main():
+        nft = Nft(netns=netns('a'))
+        await nft.cmd('add', 'table', 'filter')
+
+        nft.nft.kill()
+        with pytest.raises(RuntimeError, match='Nft has stopped'):
+            await nft.cmd('list', 'ruleset')
+
+        await nft.nft.wait()
+
+    asyncio.run(main())
+
+
+def test_missing_namespace_raises(fake_nft, tmp_path):
+    async def main():
+        nft = Nft(netns=str(tmp_path / 'missing'))
+        with pytest.raises(FileNotFoundError):
+            await nft.cmd('list', 'ruleset')
+        assert nft.stopped
+
+    asyncio.run(main())
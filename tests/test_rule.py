@@ -0,0 +1,65 @@
+import pytest
+
+from asyncnft.rule import counted
+from asyncnft.rule import terminal_verdict
+
+
+@pytest.mark.parametrize(
+        'statement, expected', [
+                ("tcp dport 22 accept", "tcp dport 22 counter accept"),
+                ("ip saddr 10.0.0.1 drop", "ip saddr 10.0.0.1 counter drop"),
+                (
+                        "tcp dport { 22, 80 } accept",
+                        "tcp dport { 22, 80 } counter accept"
+                ),
+                (
+                        "ip saddr 10.0.0.1 reject with tcp reset",
+                        "ip saddr 10.0.0.1 counter reject with tcp reset"
+                ),
+                ("tcp dport 22 jump ssh", "tcp dport 22 counter jump ssh"),
+                ("tcp dport 22 log", "tcp dport 22 log counter"),
+                ("meta mark set 1", "meta mark set 1 counter"),
+                ("tcp dport 22 counter accept", "tcp dport 22 counter accept"),
+                (
+                        "ip saddr vmap { 10.0.0.1 : drop }",
+                        "ip saddr vmap { 10.0.0.1 : drop }"
+                ),
+        ]
+)
+def test_counted(statement, expected):
+    assert counted(statement) == expected
+
+
+@pytest.mark.parametrize(
+        'statement, expected', [
+                ("tcp dport 22 counter accept", 'accept'),
+                ("ip saddr 10.0.0.1 counter drop", 'drop'),
+                ("tcp dport { 22, 80 } accept", 'accept'),
+                (
+                        "ip saddr 10.0.0.1 counter reject with tcp reset",
+                        'reject with tcp reset'
+                ),
+                ("ip saddr 10.0.0.1 reject", 'reject'),
+                ("tcp dport 22 counter", None),
+                ("tcp dport 22 log accept", None),
+                ("tcp dport 22 limit rate 10/second accept", None),
+                ("tcp dport 22 quota 10 mbytes drop", None),
+                ("tcp dport 22 ct count over 10 drop", None),
+                ("tcp dport 22 last used never accept", None),
+                ("numgen inc mod 2 0 drop", None),
+                ("tcp dport 22 counter name ssh accept", None),
+                ("tcp dport 22 add @seen { ip saddr } accept", None),
+                ("tcp dport 22 update @seen { ip saddr } accept", None),
+                ("meta mark set 1 accept", None),
+                ("tcp dport 22 jump ssh", None),
+                ("tcp dport 22 goto ssh", None),
+                ("tcp dport 22 return", None),
+                ("tcp dport 22 queue num 1", None),
+                ("ip saddr vmap { 10.0.0.1 : drop }", None),
+                ("ct state established flow add @ft", None),
+                ("tcp dport 22 dnat to 10.0.0.1 accept", None),
+                ("", None),
+        ]
+)
+def test_terminal_verdict(statement, expected):
+    assert terminal_verdict(statement) == expected
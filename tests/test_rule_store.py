@@ -0,0 +1,129 @@
+import asyncio
+
+import pytest
+
+from asyncnft import Ruleset
+from asyncnft.chain import Chain
+from asyncnft.rule import Rule
+from asyncnft.table import Table
+
+
+class _Ruleset:
+    nft = None
+
+
+def make_chain():
+    return Chain('input', Table('filter', _Ruleset()))
+
+
+def make_rule(chain, handle):
+    rule = Rule(f"rule{handle}", chain)
+    rule.handle = handle
+    return rule
+
+
+def order(chain):
+    return [rule.handle for rule in chain]
+
+
+def test_insert_and_append():
+    chain = make_chain()
+    rules = {h: make_rule(chain, h) for h in range(1, 7)}
+
+    chain.rules.append(rules[1])
+    chain.rules.append(rules[2])
+    chain.rules.insert(rules[3])
+    chain.rules.insert(rules[4], before=rules[2])
+    chain.rules.append(rules[5], after=rules[1])
+    chain.rules.append(rules[6], after=rules[2])
+
+    assert order(chain) == [3, 1, 5, 4, 2, 6]
+    assert len(chain.rules) == 6
+    assert chain.rule_by_handle(4) is rules[4]
+    assert chain.rule_by_handle(9) is None
+    assert [chain.rule_at(i).handle for i in range(6)] == order(chain)
+    assert chain.rule_at(-1) is rules[6]
+    with pytest.raises(IndexError):
+        chain.rule_at(6)
+
+
+def test_remove_and_discard():
+    chain = make_chain()
+    rules = {h: make_rule(chain, h) for h in range(1, 5)}
+    for rule in rules.values():
+        chain.rules.append(rule)
+
+    chain.rules.remove(rules[1])
+    chain.rules.remove(rules[4])
+    assert order(chain) == [2, 3]
+    assert chain.rule_at(0) is rules[2]
+
+    chain.rules.discard(3)
+    assert order(chain) == [2]
+    assert rules[3].handle == 0
+
+    chain.rules.discard(42)
+    chain.rules.remove(rules[1])
+    assert order(chain) == [2]
+
+    chain.rules.insert(rules[1])
+    chain.rules.append(rules[4])
+    assert order(chain) == [1, 2, 4]
+
+
+def test_remove_ignores_other_rule_with_same_handle():
+    chain, other = make_chain(), make_chain()
+    rule = make_rule(chain, 1)
+    chain.rules.append(rule)
+
+    other.rules.remove(make_rule(other, 1))
+    chain.rules.remove(make_rule(chain, 1))
+    assert order(chain) == [1]
+
+
+def test_clear():
+    chain = make_chain()
+    rules = [make_rule(chain, h) for h in range(1, 4)]
+    for rule in rules:
+        chain.rules.append(rule)
+    chain.rule_at(0)
+
+    chain.rules.clear()
+    assert order(chain) == []
+    assert len(chain.rules) == 0
+    assert all(rule.handle == 0 for rule in rules)
+    with pytest.raises(IndexError):
+        chain.rule_at(0)
+
+
+def test_anchor_from_another_store_is_appended():
+    chain, other = make_chain(), make_chain()
+    foreign = make_rule(other, 10)
+    other.rules.append(foreign)
+
+    chain.rules.append(make_rule(chain, 1))
+    chain.rules.insert(make_rule(chain, 2), before=foreign)
+    chain.rules.append(make_rule(chain, 3), after=foreign)
+
+    assert order(chain) == [1, 2, 3]
+    assert order(other) == [10]
+
+
+def test_anchor_from_another_chain_object(fake_nft):
+    async def main():
+        ruleset = Ruleset()
+        table = await ruleset.table('filter')
+        first = await table.chain('input')
+        second = await table.chain('input')
+
+        anchor = await first.append_rule('tcp dport 22 accept')
+        await second.append_rule('tcp dport 80 accept')
+        rule = await second.insert_rule('tcp dport 443 accept', before=anchor)
+
+        listing = await first.list()
+        assert listing.index('dport 443') < listing.index('dport 22')
+        assert second.rule_by_handle(rule.handle) is rule
+
+        await ruleset.nft.close()
+
+    asyncio.run(main())
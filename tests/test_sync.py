@@ -0,0 +1,81 @@
+import time
+import asyncio
+import threading
+import concurrent.futures
+
+import pytest
+
+from asyncnft import NftThread
+from asyncnft import SyncRuleset
+
+
+def test_threads_share_one_session(fake_nft):
+    with SyncRuleset() as ruleset:
+        table = ruleset.table('filter')
+        errors = []
+
+        def worker(i):
+            try:
+                chain = table.chain(f"chain{i}")
+                for port in range(5):
+                    chain.append_rule(f"tcp dport {port} accept")
+                assert [r.statement for r in chain] == [
+                        f"tcp dport {port} accept" for port in range(5)
+                ]
+            except Exception as exc:
+                errors.append(exc)
+
+        threads = [
+                threading.Thread(target=worker, args=(i, )) for i in range(8)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert errors == []
+
+        listing = ruleset.list()
+        for i in range(8):
+            assert f"chain chain{i} {{" in listing
+        assert listing.count('accept # handle') == 40
+
+    assert len(fake_nft) == 1
+
+
+def test_timed_out_call_is_cancelled():
+    thread = NftThread()
+    thread.timeout = 0.05
+    ran = []
+
+    async def slow():
+        await asyncio.sleep(0.2)
+        ran.append(True)
+
+    with pytest.raises(concurrent.futures.TimeoutError):
+        thread.call(slow)
+
+    time.sleep(0.4)
+    assert ran == []
+
+    thread.close()
+
+
+def test_close_stops_the_loop():
+    thread = NftThread()
+
+    async def close_from_loop():
+        thread.close()
+
+    with pytest.raises(RuntimeError):
+        thread.call(close_from_loop)
+
+    async def pending():
+        asyncio.ensure_future(asyncio.sleep(10))
+
+    thread.call(pending)
+    thread.close()
+
+    assert thread.loop.is_closed()
+    with pytest.raises(RuntimeError):
+        thread.call(pending)